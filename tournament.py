@@ -4,78 +4,230 @@
 #
 
 import itertools
+import threading
+import weakref
 from random import shuffle
 from contextlib import contextmanager
 
+import networkx
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+from psycopg2.extras import execute_values
+
+
+class TournamentError(Exception):
+    """Raised when a tournament operation can't be carried out."""
+
+
+class AlreadyHadBye(TournamentError):
+    """Raised when a bye is given to a player who has already had one."""
+
+
+class UnknownPlayer(TournamentError):
+    """Raised when a bye is given to a player id that isn't registered."""
+
+
+class IncompleteRound(TournamentError):
+    """Raised when pairings are asked for before a round has finished."""
+
+
+class OverallWinnerExists(TournamentError):
+    """Raised when pairings are asked for after the tournament is won."""
+
+
+class NoPairingsWithoutRepeats(TournamentError):
+    """Raised when every possible set of pairings contains a rematch."""
+
+
+# Pool of open database connections, keyed by database name. Connections are
+# handed out by connect_to_db() and returned to the pool afterwards, rather
+# than being opened and closed for every query.
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+_POOL_MIN_CONNECTIONS = 1
+_POOL_MAX_CONNECTIONS = 16
+
+# Statements prepared on a connection the first time it runs them, so the
+# queries run for each player or pair of players are only parsed and planned
+# once per connection. Each is run with execute_prepared().
+_PREPARED_STATEMENTS = {
+    'rematch_q': """SELECT EXISTS(SELECT 1
+                           FROM matches
+                           WHERE LEAST(winner_pid, loser_pid)=$1
+                               AND GREATEST(winner_pid, loser_pid)=$2
+                               AND loser_pid IS NOT NULL)""",
+    'name_q': "SELECT name FROM players WHERE id=$1",
+}
+
+# The names of the statements prepared on each open connection.
+_PREPARED_ON = weakref.WeakKeyDictionary()
+_PREPARED_LOCK = threading.Lock()
+
+
+def get_pool(database_name="tournament"):
+    """Returns the connection pool for a database, creating it if needed.
+    Args:
+        database_name (str): Name of PostgresSQL database to connect to.
+    Returns:
+        (ThreadedConnectionPool): Pool of connections to the database.
+    """
+    # Only one thread may create a database's pool, otherwise a second pool
+    # could replace the first and leak its connections.
+    with _POOLS_LOCK:
+        if database_name not in _POOLS:
+            _POOLS[database_name] = psycopg2.pool.ThreadedConnectionPool(
+                _POOL_MIN_CONNECTIONS, _POOL_MAX_CONNECTIONS,
+                dbname=database_name)
+
+        return _POOLS[database_name]
+
+
+def execute_prepared(cursor, name, parameters):
+    """Runs one of the statements in _PREPARED_STATEMENTS.
+    The statement is prepared on the cursor's connection the first time that
+    connection runs it, so this works with any connection, pooled or not.
+    Args:
+        cursor (cursor): Psycopg2 cursor to run the statement with.
+        name (str): Name of the statement in _PREPARED_STATEMENTS.
+        parameters (tuple): Values for the statement's parameters.
+    """
+    with _PREPARED_LOCK:
+        prepared = _PREPARED_ON.setdefault(cursor.connection, set())
+
+    if name not in prepared:
+        cursor.execute("PREPARE {} AS {};".format(
+            name, _PREPARED_STATEMENTS[name]))
+        prepared.add(name)
+
+    placeholders = ", ".join(["%s"] * len(parameters))
+    cursor.execute("EXECUTE {} ({});".format(name, placeholders), parameters)
+
+
+def rollback_quietly(connection):
+    """Rolls back a connection's transaction, ignoring any database error.
+    If the connection has died, the rollback fails too, and that error must
+    not hide the one that caused the rollback. This is a separate function so
+    that, on Python 2, the caller's bare raise still re-raises the original
+    error.
+    Args:
+        connection: Psycopg2 connection to roll back.
+    """
+    try:
+        connection.rollback()
+    except psycopg2.Error:
+        pass
 
 
 @contextmanager
 def connect_to_db(database_name="tournament"):
     """Connect to PostgreSQL database, using the context manager.
+    The connection is taken from a pool and handed back to it on exit. Any
+    transaction left open by an exception is rolled back first.
     Args:
         database_name (str): Name of PostgresSQL database to connect to.
     Yields:
         (dict): Contains the database connection and cursor Psycopg2 objects.
     """
-    try:
-        connection = psycopg2.connect("dbname={}".format(database_name))
-        cursor = connection.cursor()
-    except psycopg2.Error:
-        print "Could not connect to database:", database_name
-        raise
+    pool = get_pool(database_name)
+    connection = pool.getconn()
+    cursor = connection.cursor()
 
     try:
         yield {'connection': connection, 'cursor': cursor}
+    except Exception:
+        rollback_quietly(connection)
+        raise
     finally:
-        connection.close()
+        cursor.close()
+        pool.putconn(connection)
 
 
-def deleteMatches():
-    """Remove all the match records from the database."""
+@contextmanager
+def get_cursor(cursor=None, commit=False):
+    """Reuse a cursor if one is given, otherwise connect to the database.
+    This lets a function run its queries in the caller's transaction. A cursor
+    that is given is never committed; that is left to the caller.
+    Args:
+        cursor (cursor) [optional]: Psycopg2 cursor to reuse.
+        commit (bool) [optional]: Whether to commit a new connection's
+                                  transaction on exit.
+    Yields:
+        (cursor): The cursor given, or a cursor from connect_to_db().
+    Raises:
+        TypeError: If cursor is neither None nor a Psycopg2 cursor.
+    """
+    if cursor is not None:
+        if not isinstance(cursor, psycopg2.extensions.cursor):
+            raise TypeError("Expected a Psycopg2 cursor, got {!r}."
+                            .format(cursor))
+        yield cursor
+        return
+
     with connect_to_db() as database:
+        yield database['cursor']
+        if commit:
+            database['connection'].commit()
+
+
+def deleteMatches(cursor=None):
+    """Remove all the match records from the database."""
+    with get_cursor(cursor, commit=True) as cursor:
         query = "TRUNCATE matches;"
-        database['cursor'].execute(query)
-        database['connection'].commit()
+        cursor.execute(query)
 
 
-def deletePlayers():
+def deletePlayers(cursor=None):
     """Remove all the player records from the database."""
-    with connect_to_db() as database:
+    with get_cursor(cursor, commit=True) as cursor:
         query = "DELETE FROM players;"
-        database['cursor'].execute(query)
-        database['connection'].commit()
+        cursor.execute(query)
 
 
-def countPlayers():
+def countPlayers(cursor=None):
     """Returns the number of players currently registered."""
-    with connect_to_db() as database:
+    with get_cursor(cursor) as cursor:
         query = "SELECT COUNT(*) FROM players;"
-        database['cursor'].execute(query)
-        count = database['cursor'].fetchone()[0]
+        cursor.execute(query)
+        count = cursor.fetchone()[0]
 
     return count
 
 
-def registerPlayer(name):
+def registerPlayer(name, cursor=None):
     """Adds a player to the tournament database.
     The database assigns a unique serial id number for the player.  (This
     should be handled by your SQL database schema, not in your Python code.)
     Args:
       name: the player's full name (need not be unique).
+      cursor [optional]: a cursor to run the query with, as from get_cursor().
     """
     query = "INSERT INTO players (name) VALUES (%s);"
     parameter = (name,)
 
-    with connect_to_db() as database:
-        database['cursor'].execute(query, parameter)
-        database['connection'].commit()
+    with get_cursor(cursor, commit=True) as cursor:
+        cursor.execute(query, parameter)
+
+
+def registerPlayers(names, cursor=None):
+    """Adds several players to the tournament database in one statement.
+    Args:
+      names (list): the players' full names (need not be unique).
+      cursor [optional]: a cursor to run the query with, as from get_cursor().
+    """
+    query = "INSERT INTO players (name) VALUES %s;"
+    parameters = [(name,) for name in names]
 
+    with get_cursor(cursor, commit=True) as cursor:
+        execute_values(cursor, query, parameters)
 
-def playerStandings():
+
+def playerStandings(cursor=None):
     """Returns a list of the players and their win records, sorted by wins.
     The first entry in the list should be the player in first place, or a player
     tied for first place if there is currently a tie.
+    Args:
+      cursor [optional]: a cursor to run the query with, as from get_cursor().
     Returns:
       A list of tuples, each of which contains (id, name, wins, matches):
         id: the player's unique id (assigned by the database)
@@ -87,17 +239,18 @@ def playerStandings():
              "       num_matches_wins.matches "
              "FROM players, num_matches_wins "
              "WHERE players.id = num_matches_wins.id "
-             "ORDER BY num_matches_wins.wins desc;")
+             "ORDER BY num_matches_wins.wins desc, num_matches_wins.id;")
 
-    with connect_to_db() as database:
-        database['cursor'].execute(query)
-        standings = [(int(row[0]), str(row[1]), int(row[2]), int(row[3]))
-                     for row in database['cursor'].fetchall()]
+    # Psycopg2 already returns the id and count columns as ints and the name as
+    # a str, so the rows can be returned as they are.
+    with get_cursor(cursor) as cursor:
+        cursor.execute(query)
+        standings = cursor.fetchall()
 
     return standings
 
 
-def reportMatch(winner, loser=None):
+def reportMatch(winner, loser=None, cursor=None):
     """Records the outcome of a single match between two players.
     If only one player ID is given, this indicates that a bye is to be given to
     that player. A null is recorded in the loser_pid column of the matches
@@ -105,28 +258,88 @@ def reportMatch(winner, loser=None):
     Args:
         winner (int):  the id number of the player who won
         loser (int) [optional]:  the id number of the player who lost
+        cursor [optional]: a cursor to run the queries with, as from
+                           get_cursor().
+    Raises:
+        AlreadyHadBye: If a bye is given to a player who has had one before.
+        UnknownPlayer: If a bye is given to a player who isn't registered.
     """
-    with connect_to_db() as database:
+    with get_cursor(cursor, commit=True) as cursor:
         if loser is None:
             # So a bye is to be given to player `winner`.
-            # Check to see whether player `winner` has be give a bye before.
-            query = "SELECT had_bye FROM players WHERE id=%s"
-            parameter = (winner,)
-            database['cursor'].execute(query, parameter)
-            had_bye = database['cursor'].fetchone()[0]
+            # Update the had_bye attribute of the player and record the bye in
+            # one statement. Nothing is updated or recorded if player `winner`
+            # has been given a bye before. The statement returns no row if
+            # there is no such player, otherwise whether the bye was given.
+            query = """WITH player AS (SELECT id FROM players
+                                       WHERE id=%(winner)s),
+                            bye AS (UPDATE players SET had_bye=TRUE
+                                    WHERE id=%(winner)s AND had_bye=FALSE
+                                    RETURNING id),
+                            bye_match AS (INSERT INTO matches
+                                              (winner_pid, loser_pid)
+                                          SELECT id, NULL FROM bye)
+                       SELECT EXISTS(SELECT 1 FROM bye) FROM player;"""
+            parameter = {'winner': winner}
+            cursor.execute(query, parameter)
+
+            row = cursor.fetchone()
+            if row is None:
+                raise UnknownPlayer("No player with id {}.".format(winner))
+            if not row[0]:
+                raise AlreadyHadBye("Player has already had a bye.")
 
-            if had_bye is True:
-                print "Error: Player has already had a bye."
-                return
+        else:
+            query = ("INSERT INTO matches (winner_pid, loser_pid) "
+                     "VALUES (%s, %s);")
+            parameter = (winner, loser)
+            cursor.execute(query, parameter)
 
-            # Update the had_bye attribute of the player.
-            query = "UPDATE players SET had_bye=TRUE WHERE id=%s"
-            database['cursor'].execute(query, parameter)
 
-        query = "INSERT INTO matches (winner_pid, loser_pid) VALUES (%s, %s);"
-        parameter = (winner, loser)
-        database['cursor'].execute(query, parameter)
-        database['connection'].commit()
+def reportMatches(results, cursor=None):
+    """Records the outcomes of several matches in one transaction.
+    As with reportMatch(), a result with a loser of None gives a bye to the
+    winner. If any of those players has already had a bye, nothing is recorded.
+    Args:
+        results (list): A list of (winner, loser) tuples of player id numbers.
+        cursor [optional]: a cursor to run the queries with, as from
+                           get_cursor().
+    Raises:
+        AlreadyHadBye: If a bye is given to a player who has had one before.
+        UnknownPlayer: If a bye is given to a player who isn't registered.
+    """
+    bye_players = [winner for winner, loser in results if loser is None]
+
+    with get_cursor(cursor, commit=True) as cursor:
+        if bye_players:
+            # Give the byes, skipping any player who has had one before. The
+            # update is made under a savepoint so it can be undone without
+            # rolling back the rest of a caller's transaction.
+            # The statement returns how many of the players exist, and how
+            # many byes were given.
+            cursor.execute("SAVEPOINT give_byes;")
+            query = """WITH bye AS (UPDATE players SET had_bye=TRUE
+                                    WHERE id = ANY(%(ids)s) AND had_bye=FALSE
+                                    RETURNING id)
+                       SELECT (SELECT COUNT(*) FROM players
+                               WHERE id = ANY(%(ids)s)),
+                              (SELECT COUNT(*) FROM bye);"""
+            parameter = {'ids': bye_players}
+            cursor.execute(query, parameter)
+            num_known, num_given = cursor.fetchone()
+
+            if num_known != len(set(bye_players)):
+                cursor.execute("ROLLBACK TO SAVEPOINT give_byes;")
+                raise UnknownPlayer("No player with one of the ids {}."
+                                    .format(bye_players))
+            if num_given != len(bye_players):
+                cursor.execute("ROLLBACK TO SAVEPOINT give_byes;")
+                raise AlreadyHadBye("Player has already had a bye.")
+
+            cursor.execute("RELEASE SAVEPOINT give_byes;")
+
+        query = "INSERT INTO matches (winner_pid, loser_pid) VALUES %s;"
+        execute_values(cursor, query, results)
 
 
 def swissPairings():
@@ -141,108 +354,104 @@ def swissPairings():
             name1: the first player's name
             id2: the second player's unique id
             name2: the second player's name
+    Raises:
+        IncompleteRound: If the previous round is incomplete.
+        OverallWinnerExists: If there is already an overall winner.
+        NoPairingsWithoutRepeats: If no pairings without rematches can be
+                                  found.
+        TournamentError: If no player is left to take a bye.
     """
-    # Declare a list object to store the pairings.
-    pairings = []
-
-    # Get the current player standings
-    standings = playerStandings()
-
-    # Extract the number of matches played by each player.
-    matches = [player[3] for player in standings]
-
-    # If number of matches is zero, then need a random pairing for the 1st round
-    if sum(matches) == 0:
-        random_pairing(standings, pairings)
-        return pairings
-
-    # Check to see if all players have played the same number of matches.
-    if max(matches) != min(matches):
-        print "Incomplete previous round. Please report more matches."
-        return None
-
-    # Compile a list of win groupings
-    max_num_wins = standings[0][2]
-    win_groups = []
-
+    # Compute the pairings from one consistent, read only snapshot of the
+    # database, using a single connection. Nothing is written, so there is
+    # nothing to commit; the transaction is rolled back when the connection is
+    # returned to the pool.
     with connect_to_db() as database:
-        for wins in xrange(0, max_num_wins + 1):
-            query = "SELECT id FROM num_wins WHERE wins=%s"
-            parameter = (wins,)
-            database['cursor'].execute(query, parameter)
-            res = [int(row[0]) for row in database['cursor'].fetchall()]
-            win_groups.append(res)
-
-    # If only 1 player in the top win group, then we have an overall winner, so
-    # no need to have another round of pairings.
-    if len(win_groups[-1:][0]) == 1:
-        print "An overall winner already exists. No further round required."
-        return None
-
-    # Deal with giving a player a bye, if there are an odd number of players.
-    if len(standings) % 2 != 0:
-        # Get a player that hasn't already taken a bye.
-        bye_player_id = select_player_for_bye()
-
-        # Remove this player from the win groups.
-        for win_group in win_groups:
-            if win_group.count(bye_player_id) > 0:
-                win_group.remove(bye_player_id)
-                break
-
-        # Add this bye match to the pairings.
-        bye_player_name = id_to_name(bye_player_id)
-        pairings.append((bye_player_id, bye_player_name, bye_player_id,
-                         'Give a Bye'))
-
-    # Check to see if any of the win groups contains an odd number of players.
-    for i in xrange(0, len(win_groups)):
-        if len(win_groups[i]) % 2 != 0:
-            move_item_to_list(win_groups, i)
-
-    # Generate pairings until no rematches exist in the pairings
-    pairing_success = False
-    while pairing_success is False:
-        pairings_res, error_in_group = generate_pairings(win_groups)
-        if error_in_group is None:
-            # Found valid pairings, so exist the while loop.
-            pairing_success = True
-
-        else:
-            # Could not find non-repeated matches in a win group.
-            if error_in_group + 2 > len(win_groups):
-                print "Error: Can't find a set of pairings with no repeats."
-                return None
+        cursor = database['cursor']
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ "
+                       "READ ONLY;")
+
+        # Declare a list object to store the pairings.
+        pairings = []
+
+        # Get the current player standings
+        standings = playerStandings(cursor=cursor)
+
+        # Extract the number of matches played by each player.
+        matches = [player[3] for player in standings]
+
+        # If number of matches is zero, then need a random pairing for the 1st
+        # round
+        if sum(matches) == 0:
+            random_pairing(standings, pairings)
+            return pairings
+
+        # Check to see if all players have played the same number of matches.
+        if max(matches) != min(matches):
+            raise IncompleteRound(
+                "Incomplete previous round. Please report more matches.")
+
+        # Take each player's wins and name from the standings, rather than
+        # querying the database for them again.
+        wins_by_id = dict((player[0], player[2]) for player in standings)
+        names = dict((player[0], player[1]) for player in standings)
+
+        # If only 1 player has the most wins, then we have an overall winner,
+        # so no need to have another round of pairings. The standings are
+        # sorted by wins, most first.
+        if len(standings) == 1 or standings[0][2] != standings[1][2]:
+            raise OverallWinnerExists("An overall winner already exists. "
+                                      "No further round required.")
+
+        # Load every match played so far, so rematches can be checked for
+        # without going back to the database.
+        played = played_pairs(cursor=cursor)
+
+        # Deal with giving a player a bye, if there are an odd number of
+        # players.
+        player_wins = dict(wins_by_id)
+        if len(standings) % 2 != 0:
+            # Get a player that hasn't already taken a bye, and leave them out
+            # of the players to be paired up.
+            bye_player_id = select_player_for_bye(standings,
+                                                  cursor=cursor)
+            del player_wins[bye_player_id]
+
+            # Add this bye match to the pairings.
+            bye_player_name = names[bye_player_id]
+            pairings.append((bye_player_id, bye_player_name, bye_player_id,
+                             'Give a Bye'))
 
-            # Add two players from the next group to the erroring group.
-            move_item_to_list(win_groups, error_in_group)
-            move_item_to_list(win_groups, error_in_group)
+        # Pair up the players as a graph matching problem, so that no rematches
+        # occur and players are matched against those with similar win
+        # records.
+        pairings_res = match_players(player_wins, played, names)
 
-        # Go around the loop again and try to generate valid pairings
+        # If the matching couldn't pair everyone, then no set of pairings
+        # without rematches exists.
+        if pairings_res is None:
+            raise NoPairingsWithoutRepeats(
+                "Can't find a set of pairings with no repeats.")
 
-    # Add the pairings result from generate_pairings() to pairings.
-    pairings.extend(pairings_res)
+        pairings.extend(pairings_res)
 
-    return pairings
+        return pairings
 
 
-def check_for_rematch(player_id1, player_id2):
+def check_for_rematch(player_id1, player_id2, cursor=None):
     """Checks whether the two players specified have played a match before.
     Args:
       player_id1: ID of first player
       player_id2: ID of second player
+      cursor [optional]: a cursor to run the query with, as from get_cursor().
     Returns:
       Bool: True if they have met before, False if they have not.
     """
-    query = """SELECT EXISTS(SELECT 1
-                       FROM matches
-                       WHERE winner_pid=%(id1)s AND loser_pid=%(id2)s
-                           OR winner_pid=%(id2)s AND loser_pid=%(id1)s);"""
-    parameter = {'id1': player_id1, 'id2': player_id2}
+    # The lower id goes first, to match the matches_pair_idx index.
+    parameter = (min(player_id1, player_id2), max(player_id1, player_id2))
 
-    with connect_to_db() as database:
-        database['cursor'].execute(query, parameter)
-        is_rematch = database['cursor'].fetchone()[0]
+    with get_cursor(cursor) as cursor:
+        execute_prepared(cursor, 'rematch_q', parameter)
+        is_rematch = cursor.fetchone()[0]
 
     return is_rematch
 
@@ -251,187 +460,114 @@ def check_for_rematch(player_id1, player_id2):
     # http://stackoverflow.com/questions/7471625/
 
 
-def id_to_name(player_id):
+def played_pairs(cursor=None):
+    """Returns the set of pairs of players that have played each other.
+    Byes are not included, as they don't have a loser.
+    Args:
+      cursor [optional]: a cursor to run the query with, as from get_cursor().
+    Returns:
+      frozenset: Each item is a frozenset of the two player ids in a match.
+    """
+    query = ("SELECT winner_pid, loser_pid FROM matches "
+             "WHERE loser_pid IS NOT NULL;")
+
+    with get_cursor(cursor) as cursor:
+        cursor.execute(query)
+        played = frozenset(frozenset((winner, loser)) for winner, loser
+                           in cursor.fetchall())
+
+    return played
+
+
+def id_to_name(player_id, cursor=None):
     """Returns a player's name based on a given ID number.
     Args:
       player_id: ID of player
+      cursor [optional]: a cursor to run the query with, as from get_cursor().
     Returns:
       Str: Player's name.
     """
-    query = "SELECT name FROM players WHERE id=%s"
     parameter = (player_id,)
 
-    with connect_to_db() as database:
-        database['cursor'].execute(query, parameter)
-        player_name = database['cursor'].fetchone()[0]
+    with get_cursor(cursor) as cursor:
+        execute_prepared(cursor, 'name_q', parameter)
+        player_name = cursor.fetchone()[0]
 
     return player_name
 
 
-def generate_pairings(win_groups):
-    """Generates pairings given player IDs sorted into win groups.
+def match_players(player_wins, played, names):
+    """Pairs up players using a maximum weight matching on a graph.
+    Each player is a node, and an edge joins every two players that haven't
+    already played each other. An edge between players whose wins differ by
+    d is weighted -(n ** d), where n is the number of players. One pair d
+    wins apart then costs more than every pair being d - 1 wins apart, so the
+    best matching pairs players with the closest win records, keeping the
+    largest difference in wins as small as possible.
     Args:
-        win_groups (list): A list where each item is a list of player ids with
-                           the same number of wins (though this may be adjusted
-                           if no non-repeated match ups could found previously).
+        player_wins (dict): Maps the id of each player to be paired to the
+                            number of wins the player has.
+        played (frozenset): Pairs of player ids that have already played each
+                            other, as returned by played_pairs().
+        names (dict): Maps player ids to names.
     Returns:
         pairings (list): A list of tuples, each of which contains (id1, name1,
-                         id2, name2)
-            id1: the first player's unique id
-            name1: the first player's name
-            id2: the second player's unique id
-            name2: the second player's name
-        idx (int): If no non-repeated match ups could be found, this tells the
-                   calling function which win group the issue is in so it can
-                   be resolved.
-    """
-    # For each win group, try each combination of matches, checking for
-    # rematches.
-    pairings = []
-    for idx, win_group in enumerate(win_groups):
-        win_group_success = False
-        # Go through each pair in the win group, checking for rematches.
-        for pairs in all_pairs(win_group):
-            # Go through each pair in the win group, checking for rematches.
-            contains_rematch = False
-            for pair in pairs:
-                is_rematch = check_for_rematch(pair[0], pair[1])
-                if is_rematch is True:
-                    contains_rematch = True
-                    break
-
-            if contains_rematch is True:
-                # This set of pairs contains a rematch. Try the next pairing
-                # permutation.
-                continue
-            else:
-                win_group_success = True
-                for pair in pairs:
-                    # Add this pairing to the pairings
-                    player1_name = id_to_name(pair[0])
-                    player2_name = id_to_name(pair[1])
-                    pairings.append((pair[0], player1_name, pair[1],
-                                     player2_name))
-                break
-
-        # If there was no success on any pair permutation, return to
-        # swissPairings() to adjust the groupings.
-        if win_group_success is False:
-            return None, idx
-
-    return pairings, None
-
-
-def all_pairs(lst):
-    """Takes a list and generates all the unique pairs it contains.
-    The order of the pairs is not important and the ordering of each pair is
-    not important. The list must be of even length.
-    This function was written by gatoatigrado (Stack Overflow username) and the
-    original can be found here: http://stackoverflow.com/a/13020502
-    I have used this function as it precisely gives me what I wanted, without
-    producing excessive repeated pairings for this application.
-    Args:
-        lst (list): a list of items to be paired up
-    Yields:
-        list: The next set of pairs. Each pair consists of items from the
-              original list placed within a tuple.
-    Example:
-        Here is an example of the output for a list of 4 items.
-        >>> for pairs in all_pairs([1, 2, 3, 4]):
-                print pairs
-        [(1, 2), (3, 4)]
-        [(1, 3), (2, 4)]
-        [(1, 4), (2, 3)]
-        For a list of 4 items, the argument to the itertools.product() function
-        is:
-            [0, 1, 2], [0]
-        Which will produce the following output from the product() function:
-            (0, 0)
-            (1, 0)
-            (2, 0)
-        So these results mean there will be 3 sets of pairs containing 2 pairs
-        each.
-        For the first set (0, 0), the pop function is always pop(0) - taking
-        the first item off the temp list. So this just produces two pairs in the
-        same order as per the original list.
-        For set (1, 0), the first pair is (1, 3), as the first item of the first
-        pair is always the first item from the original list and the 1 means an
-        item is skipped and 3 is selected. The second pair is just what is left,
-        (2, 4).
-        For set (2, 0), 2 items are skipped, so the first pair is (1, 4). Then
-        what's left is (2, 3) for the 2nd pair.
+                         id2, name2), with the pairs with the most wins first.
+                         None if not every player could be paired without a
+                         rematch.
     """
-    # Check to make sure there are an even number of items in the list.
-    list_length = len(lst)
-    if list_length % 2 != 0:
-        raise ValueError("The list must have an even number of items.")
-
-    # Create an iterator that goes through all the choices of which item to
-    # pair up next.
-    choice_indices = itertools.product(
-        *[xrange(k) for k in reversed(xrange(1, list_length, 2))])
-
-    # Generate a list of pairs for each choice
-    for choice in choice_indices:
-        # Create a temporary copy of the list, so it can be consumed by calls to
-        # pop().
-        tmp = lst[:]
-        result = []
-
-        # Go through this choice of indices, consuming the temp list two items
-        # at a time creating pairs and creating the set of pairs in result.
-        for index in choice:
-            result.append((tmp.pop(0), tmp.pop(index)))
-
-        yield result
-
-
-def move_item_to_list(list_of_lists, target_list_idx):
-    """Takes a list of lists and moves one item to the list specified from the
-       next list.
-    This function works in-place upon the list of lists.
-    Args:
-        list_of_lists (list): A list of lists.
-        target_list_idx (int): Index of the list that will have an item moved
-                               to it.
-    Returns:
-        None: The list is modified in place.
-    """
-    # Check to see if the next list exists
-    if target_list_idx + 2 > len(list_of_lists):
-        raise IndexError("No list to move an item from exists.")
-
-    # Add an element from the next group to the group specified in the arguments
-    list_of_lists[target_list_idx].append(
-        list_of_lists[target_list_idx + 1].pop(0))
+    base = len(player_wins)
+    graph = networkx.Graph()
+    graph.add_nodes_from(player_wins)
+    for player_id1, player_id2 in itertools.combinations(player_wins, 2):
+        if frozenset((player_id1, player_id2)) not in played:
+            win_difference = abs(player_wins[player_id1] -
+                                 player_wins[player_id2])
+            graph.add_edge(player_id1, player_id2,
+                           weight=-(base ** win_difference))
+
+    matching = networkx.max_weight_matching(graph, maxcardinality=True)
+    if len(matching) * 2 != len(player_wins):
+        return None
 
-    # Check to see if the above operation created an empty group. If so then
-    # remove it.
-    if len(list_of_lists[target_list_idx + 1]) == 0:
-        del list_of_lists[target_list_idx + 1]
+    # Put the higher placed player first in each pair, and the pairs with the
+    # most wins first.
+    pairs = [tuple(sorted(pair, key=lambda player_id: -player_wins[player_id]))
+             for pair in matching]
+    pairs.sort(key=lambda pair: -player_wins[pair[0]])
 
-    return None
+    return [(pair[0], names[pair[0]], pair[1], names[pair[1]])
+            for pair in pairs]
 
 
-def select_player_for_bye():
+def select_player_for_bye(standings, cursor=None):
     """Returns a player id of a player that hasn't already taken a bye.
-    The query to the database makes sure to return the player with the fewest
-    number of wins, to avoid a situation where one of the top players wins the
-    tournament with a bye.
+    The player with the fewest number of wins is returned, to avoid a situation
+    where one of the top players wins the tournament with a bye.
+    Args:
+        standings (list): The player standings, as returned by
+                          playerStandings().
+        cursor [optional]: A cursor to run the query with, as from
+                           get_cursor().
     Returns:
         non_bye_player_id (int): The player id of a player that hasn't taken a
                                  bye.
+    Raises:
+        TournamentError: If every player has already taken a bye.
     """
-    query = """SELECT players.id
-               FROM players, num_wins
-               WHERE players.had_bye=FALSE and players.id = num_wins.id
-               ORDER BY num_wins.wins;"""
+    query = "SELECT id FROM players WHERE had_bye=TRUE;"
 
-    with connect_to_db() as database:
-        database['cursor'].execute(query)
-        non_bye_player_id = database['cursor'].fetchone()[0]
+    with get_cursor(cursor) as cursor:
+        cursor.execute(query)
+        had_bye = set(row[0] for row in cursor.fetchall())
 
-    return non_bye_player_id
+    candidates = [player for player in standings if player[0] not in had_bye]
+    if not candidates:
+        raise TournamentError("Every player has already had a bye.")
+
+    non_bye_player = min(candidates, key=lambda player: player[2])
+
+    return non_bye_player[0]
 
 
 def random_pairing(standings, pairings):
@@ -442,30 +578,21 @@ def random_pairing(standings, pairings):
     Returns:
         Nothing: pairings is modified in place.
     """
-    # Randomly shuffle the standings in place.
-    shuffle(standings)
-
-    # Check to see if there are an odd number of players.
-    have_odd_players = False
-    if len(standings) % 2 != 0:
-        have_odd_players = True
-
-    # If we have an odd number of players, we need to deal with a bye for a
-    # player.
-    # Let's keep track of that.
-    if have_odd_players is True:
-        dealt_with_bye = False
-
-    # Go through standings two at a time and generate the pairings [1].
-    standings_it = iter(standings)
-    for home_player in standings_it:
-        if have_odd_players is True and dealt_with_bye is False:
-            pairings.append((home_player[0], home_player[1], home_player[0],
-                             'Give a Bye'))
-            dealt_with_bye = True
-        else:
-            away_player = next(standings_it)
-            pairings.append((home_player[0], home_player[1], away_player[0],
-                             away_player[1]))
+    # Randomly shuffle the order the players are taken from the standings.
+    order = list(range(len(standings)))
+    shuffle(order)
+
+    # If we have an odd number of players, give the first player a bye.
+    if len(order) % 2 != 0:
+        bye_player = standings[order.pop(0)]
+        pairings.append((bye_player[0], bye_player[1], bye_player[0],
+                         'Give a Bye'))
+
+    # Go through the shuffled order two at a time and generate the pairings.
+    for i in range(0, len(order), 2):
+        home_player = standings[order[i]]
+        away_player = standings[order[i + 1]]
+        pairings.append((home_player[0], home_player[1], away_player[0],
+                         away_player[1]))
 
     return
\ No newline at end of file
@@ -25,6 +25,12 @@ CREATE TABLE matches ( id serial PRIMARY KEY,
                        winner_pid int references players(id),
                        loser_pid int references players(id));
 
+-- Index of the matches played between each pair of players, whichever of them
+-- won, so that checking for a rematch takes a single index probe.
+CREATE INDEX matches_pair_idx
+    ON matches (LEAST(winner_pid, loser_pid), GREATEST(winner_pid, loser_pid))
+    WHERE loser_pid IS NOT NULL;
+
 -- View of the number of wins each player has achieved.
 -- Columns: Player ID, Number of Wins
 CREATE VIEW num_wins